@@ -4,6 +4,7 @@ import hashlib
 import select
 import socket
 import struct
+import threading
 import time
 
 from pyrad import host
@@ -14,6 +15,27 @@ EAP_CODE_REQUEST = 1
 EAP_CODE_RESPONSE = 2
 EAP_TYPE_IDENTITY = 1
 
+# Prefer epoll where the platform offers it; it avoids rebuilding the
+# fd set in the kernel on every wait.
+_EPOLL = getattr(select, 'epoll', None)
+_POLLIN = select.EPOLLIN if _EPOLL else select.POLLIN
+
+# Precompiled EAP header layouts; struct.pack with an interpolated
+# format string reparses the format on every call.
+_EAP_HDR = struct.Struct('!BBHB')
+_EAP_MD5_HDR = struct.Struct('!BBHBB')
+
+# Zero-copy completions arrive on the error queue as sock_extended_err
+# records (ee_errno, ee_origin, ee_type, ee_code, ee_pad, ee_info,
+# ee_data); for MSG_ZEROCOPY, ee_info..ee_data is the acknowledged
+# range of per-socket send counters.
+_EXT_ERR = struct.Struct('=IBBBBII')
+_SO_EE_ORIGIN_ZEROCOPY = 5
+
+# Not every build exposes the flag even where the kernel supports the
+# feature; fall back to the Linux value.
+_MSG_ZEROCOPY = getattr(socket, 'MSG_ZEROCOPY', 0x4000000)
+
 
 class Timeout(Exception):
     """Simple exception class which is raised when a timeout occurs
@@ -30,11 +52,13 @@ class Client(host.Host):
     :type retries: integer
     :ivar timeout: number of seconds to wait for an answer
     :type timeout: float
+    :ivar workers: number of sockets to fan sends out over
+    :type workers: integer
     """
 
     def __init__(self, server, authport=1812, acctport=1813,
                  coaport=3799, secret=b'', dict=None, retries=3,
-                 timeout=5):
+                 timeout=5, workers=1, zerocopy=False):
 
         """Constructor.
 
@@ -50,15 +74,46 @@ class Client(host.Host):
         :type    secret: bytes
         :param     dict: RADIUS dictionary
         :type      dict: pyrad.dictionary.Dictionary
+        :param  workers: number of SO_REUSEPORT sockets to spread sends
+                         over; only used where the platform supports it
+        :type   workers: integer
+        :param zerocopy: request MSG_ZEROCOPY transmission; only used
+                         where the platform supports it
+        :type  zerocopy: boolean
         """
         host.Host.__init__(self, authport, acctport, coaport, dict)
 
         self.server = server
         self.secret = secret
         self._socket = None
+        self._socks = []
+        self._family = None
         self.retries = retries
         self.timeout = timeout
-        self._poll = select.poll()
+        self.workers = workers
+        # Exact-type port dispatch; avoids chained isinstance checks on
+        # every send. Maps to attribute names rather than port numbers
+        # so assigning authport/acctport/coaport after construction
+        # still takes effect.
+        self._port_by_type = {
+            packet.AuthPacket: 'authport',
+            packet.CoAPacket: 'coaport',
+            packet.AcctPacket: 'acctport',
+        }
+        self._poll = _EPOLL() if _EPOLL else select.poll()
+        # Registered fd to socket mapping, so the receive loops can
+        # read from whichever pool socket the poll event names.
+        self._fdmap = {}
+        self._local_addr = None
+        self._resolved_ip = None
+        self._zerocopy = zerocopy and hasattr(socket, 'SO_ZEROCOPY')
+        # Per-fd zero-copy send counters and the payloads still owned
+        # by the kernel, keyed by counter; see _reap_zerocopy.
+        self._zc_seq = {}
+        self._zc_pending = {}
+        # Reusable receive buffer; avoids allocating 4KB per reply.
+        self._rxbuf = bytearray(4096)
+        self._rxmv = memoryview(self._rxbuf)
 
     def bind(self, addr):
         """Bind socket to an address.
@@ -68,28 +123,189 @@ class Client(host.Host):
         :param addr: network address (hostname or IP) and port to bind to
         :type  addr: host,port tuple
         """
+        self._local_addr = addr
         self._close_socket()
         self._open_socket()
-        self._socket.bind(addr)
 
     def _open_socket(self):
-        try:
-            family = socket.getaddrinfo(self.server, 'www')[0][0]
-        except:
-            family = socket.AF_INET
         if not self._socket:
-            self._socket = socket.socket(family,
-                                         socket.SOCK_DGRAM)
-            self._socket.setsockopt(socket.SOL_SOCKET,
+            if self._family is None:
+                # Resolve the address family once per client; passing
+                # None as service and filtering on SOCK_DGRAM skips the
+                # services lookup and yields a single result.
+                try:
+                    info = socket.getaddrinfo(
+                        self.server, None, type=socket.SOCK_DGRAM)[0]
+                    self._family = info[0]
+                    # Numeric address from the same lookup; saves the
+                    # socket module a resolution per sendto.
+                    self._resolved_ip = info[4][0]
+                except:
+                    self._family = socket.AF_INET
+            family = self._family
+            if self.workers > 1 and hasattr(socket, 'SO_REUSEPORT'):
+                # Several sockets sharing one local port let the kernel
+                # hash flows to distinct receive queues instead of
+                # contending on a single socket lock.
+                for _ in range(self.workers):
+                    sock = socket.socket(family, socket.SOCK_DGRAM)
+                    sock.setsockopt(socket.SOL_SOCKET,
                                     socket.SO_REUSEADDR, 1)
-            self._poll.register(self._socket, select.POLLIN)
+                    sock.setsockopt(socket.SOL_SOCKET,
+                                    socket.SO_REUSEPORT, 1)
+                    self._enable_zerocopy(sock)
+                    # Receives are gated on poll readiness, so the
+                    # sockets can be non-blocking; a raced-away
+                    # datagram then costs an EWOULDBLOCK instead of
+                    # a stall.
+                    sock.setblocking(False)
+                    if self._local_addr is not None:
+                        sock.bind(self._local_addr)
+                    self._poll_register(sock)
+                    self._socks.append(sock)
+                self._socket = self._socks[0]
+            else:
+                self._socket = socket.socket(family,
+                                             socket.SOCK_DGRAM)
+                self._socket.setsockopt(socket.SOL_SOCKET,
+                                        socket.SO_REUSEADDR, 1)
+                self._enable_zerocopy(self._socket)
+                self._socket.setblocking(False)
+                if self._local_addr is not None:
+                    self._socket.bind(self._local_addr)
+                self._poll_register(self._socket)
 
     def _close_socket(self):
-        if self._socket:
+        if self._socks:
+            for sock in self._socks:
+                self._poll.unregister(sock)
+                self._forget_socket(sock)
+                sock.close()
+            self._socks = []
+            self._socket = None
+        elif self._socket:
             self._poll.unregister(self._socket)
+            self._forget_socket(self._socket)
             self._socket.close()
             self._socket = None
 
+    def _forget_socket(self, sock):
+        """Drop the per-fd state kept for a socket being closed."""
+        fd = sock.fileno()
+        self._fdmap.pop(fd, None)
+        self._zc_seq.pop(fd, None)
+        self._zc_pending.pop(fd, None)
+
+    def _enable_zerocopy(self, sock):
+        """Opt a socket into MSG_ZEROCOPY transmission if requested.
+
+        Disabled again for the whole client if the kernel refuses the
+        option, so the send path does not retry it per datagram.
+        """
+        if not self._zerocopy:
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_ZEROCOPY, 1)
+        except OSError:
+            self._zerocopy = False
+
+    def _sendto(self, sock, data, target):
+        """Transmit one datagram, zero-copy when enabled."""
+        if self._zerocopy:
+            try:
+                sock.sendmsg([data], [], _MSG_ZEROCOPY, target)
+            except OSError:
+                # The kernel can refuse zero-copy at send time (payload
+                # too small to be worth pinning); fall back permanently.
+                self._zerocopy = False
+                sock.sendto(data, target)
+                return
+            # The kernel reads the payload pages after sendmsg returns,
+            # so hold a reference until a completion notification
+            # acknowledges the send counter.
+            fd = sock.fileno()
+            seq = self._zc_seq.get(fd, -1) + 1
+            self._zc_seq[fd] = seq
+            self._zc_pending.setdefault(fd, {})[seq] = data
+            self._reap_zerocopy(sock)
+            return
+        sock.sendto(data, target)
+
+    def _reap_zerocopy(self, sock):
+        """Release payloads whose zero-copy sends have completed.
+
+        Completion notifications queue up on the error queue; each one
+        carries the range of send counters the kernel is done reading
+        from, so the matching payloads can be dropped.
+        """
+        pending = self._zc_pending.get(sock.fileno())
+        while pending:
+            try:
+                (_, ancdata, _, _) = sock.recvmsg(
+                    0, 128, socket.MSG_ERRQUEUE | socket.MSG_DONTWAIT)
+            except (BlockingIOError, OSError):
+                return
+            if not ancdata:
+                return
+            for (_level, _type, cmsg) in ancdata:
+                if len(cmsg) < _EXT_ERR.size:
+                    continue
+                (_errno, origin, _etype, _code, _pad,
+                 lo, hi) = _EXT_ERR.unpack_from(cmsg)
+                if origin != _SO_EE_ORIGIN_ZEROCOPY:
+                    continue
+                for seq in range(lo, hi + 1):
+                    pending.pop(seq, None)
+
+    def _poll_register(self, sock):
+        """Register a socket with the poll object.
+
+        epoll refuses fds that do not support it (such as regular
+        files); degrade to plain poll in that case, which accepts
+        any fd.
+        """
+        self._fdmap[sock.fileno()] = sock
+        try:
+            self._poll.register(sock, _POLLIN)
+        except PermissionError:
+            self._poll = select.poll()
+            for registered in self._socks:
+                self._poll.register(registered, select.POLLIN)
+            self._poll.register(sock, select.POLLIN)
+
+    def _poll_wait(self, remaining):
+        """Wait until a socket is readable, for at most remaining seconds.
+
+        epoll takes its timeout in seconds while poll uses milliseconds,
+        so the conversion lives here instead of at every call site.
+        """
+        if _EPOLL and isinstance(self._poll, _EPOLL):
+            return self._poll.poll(remaining)
+        return self._poll.poll(remaining * 1000)
+
+    def _packet_port(self, pkt):
+        """Return the destination port for a packet.
+
+        Subclasses of the packet classes miss the exact-type map and
+        fall through to isinstance checks; anything unrecognized goes
+        to the accounting port, as before.
+        """
+        attr = self._port_by_type.get(type(pkt))
+        if attr is None:
+            if isinstance(pkt, packet.AuthPacket):
+                attr = 'authport'
+            elif isinstance(pkt, packet.CoAPacket):
+                attr = 'coaport'
+            else:
+                attr = 'acctport'
+        return getattr(self, attr)
+
+    def _pick_socket(self):
+        """Pick the socket the current thread should send on."""
+        if self._socks:
+            return self._socks[threading.get_ident() % len(self._socks)]
+        return self._socket
+
     def create_auth_packet(self, **args):
         """Create a new RADIUS packet.
         This utility function creates a new RADIUS packet which can
@@ -126,6 +342,68 @@ class Client(host.Host):
         """
         return host.Host.create_coa_packet(self, secret=self.secret, **args)
 
+    def _bump_acct_delay(self, pkt):
+        """Raise Acct-Delay-Time by the timeout ahead of a retransmit."""
+        if "Acct-Delay-Time" in pkt:
+            pkt["Acct-Delay-Time"] = \
+                pkt["Acct-Delay-Time"][0] + self.timeout
+        else:
+            pkt["Acct-Delay-Time"] = self.timeout
+
+    def _recv_datagrams(self, sock, deadline):
+        """Yield raw datagrams that arrive before the deadline passes.
+
+        Waits on every registered socket: the kernel hashes a reply to
+        an arbitrary member of the SO_REUSEPORT group, so it may land
+        on a different socket than the one the request left on. Reads
+        go to whichever socket the poll event names, falling back to
+        the sending socket for unregistered fds.
+        """
+        if len(self._socks) > 1:
+            # The pool exists for concurrent senders, so each call
+            # receives into its own buffer; sharing one would let a
+            # sibling thread overwrite a reply between the recv and
+            # the copy below.
+            buf = bytearray(4096)
+            mv = memoryview(buf)
+        else:
+            buf = self._rxbuf
+            mv = self._rxmv
+        while (remaining := deadline - time.monotonic_ns()) > 0:
+            ready = self._poll_wait(remaining / 1e9)
+            if not ready:
+                continue
+            for (fd, _event) in ready:
+                # The sockets are non-blocking, so a sibling draining
+                # the datagram after poll reported it surfaces as
+                # BlockingIOError rather than a stall.
+                try:
+                    n = self._fdmap.get(fd, sock).recv_into(buf, 4096)
+                except (BlockingIOError, socket.timeout,
+                        InterruptedError):
+                    continue
+                yield bytes(mv[:n])
+
+    def _collect_replies(self, sock, deadline, pending, replies):
+        """Match datagrams to pending requests by RADIUS identifier.
+
+        Verified replies move their request from pending to replies;
+        datagrams with unknown or duplicate identifiers are dropped.
+        """
+        for rawreply in self._recv_datagrams(sock, deadline):
+            pkt = pending.get(rawreply[1]) if len(rawreply) > 1 else None
+            if pkt is None:
+                continue
+            try:
+                reply = pkt.create_reply(packet=rawreply)
+                if pkt.verify_reply(reply, rawreply):
+                    replies[pkt.id] = reply
+                    del pending[pkt.id]
+            except packet.PacketError:
+                pass
+            if not pending:
+                return
+
     def _send_packet(self, pkt, port):
         """Send a packet to a RADIUS server.
 
@@ -138,37 +416,76 @@ class Client(host.Host):
         :raise Timeout: RADIUS server does not reply
         """
         self._open_socket()
+        sock = self._pick_socket()
 
-        for attempt in range(self.retries):
-            if attempt and pkt.code == PacketCode.ACCOUNTING_REQUEST:
-                if "Acct-Delay-Time" in pkt:
-                    pkt["Acct-Delay-Time"] = \
-                        pkt["Acct-Delay-Time"][0] + self.timeout
-                else:
-                    pkt["Acct-Delay-Time"] = self.timeout
+        target = (self._resolved_ip or self.server, port)
 
-            now = time.time()
-            waitto = now + self.timeout
+        # Identifier and authenticator must not change between retries
+        # (RFC 2865 section 4.1), so the wire bytes are identical and
+        # only need to be re-encoded when Acct-Delay-Time is bumped.
+        raw = None
 
-            self._socket.sendto(pkt.create_raw_request(), (self.server, port))
+        for attempt in range(self.retries):
+            if attempt and pkt.code == PacketCode.ACCOUNTING_REQUEST:
+                self._bump_acct_delay(pkt)
+                raw = None
+            if raw is None:
+                raw = pkt.create_raw_request()
 
-            while now < waitto:
-                ready = self._poll.poll((waitto - now) * 1000)
+            deadline = time.monotonic_ns() + int(self.timeout * 1e9)
 
-                if ready:
-                    rawreply = self._socket.recv(4096)
-                else:
-                    now = time.time()
-                    continue
+            self._sendto(sock, raw, target)
 
+            for rawreply in self._recv_datagrams(sock, deadline):
                 try:
                     reply = pkt.create_reply(packet=rawreply)
                     if pkt.verify_reply(reply, rawreply):
                         return reply
-                except PacketCode.PacketError:
+                except packet.PacketError:
                     pass
 
-                now = time.time()
+        raise Timeout
+
+    def send_packets(self, pkts):
+        """Send a batch of packets to a RADIUS server.
+        All requests are serialized up front and sent out in one burst
+        per retry round, so the whole batch shares a single timeout
+        window instead of paying it once per packet. Replies are
+        matched to their request by RADIUS identifier, so the packets
+        must carry distinct identifiers.
+
+        :param pkts: the packets to send
+        :type pkts:  sequence of pyrad.packet.Packet instances
+        :return:     the reply packets received, in request order
+        :rtype:      list of pyrad.packet.Packet
+        :raise Timeout: RADIUS server does not reply to every request
+        """
+        self._open_socket()
+
+        server = self._resolved_ip or self.server
+        targets = dict(
+            (pkt.id, (server, self._packet_port(pkt))) for pkt in pkts)
+
+        pending = dict((pkt.id, pkt) for pkt in pkts)
+        raws = dict((pkt.id, pkt.create_raw_request()) for pkt in pkts)
+        replies = {}
+
+        for attempt in range(self.retries):
+            if attempt:
+                for (id, pkt) in pending.items():
+                    if pkt.code == PacketCode.ACCOUNTING_REQUEST:
+                        self._bump_acct_delay(pkt)
+                        raws[id] = pkt.create_raw_request()
+
+            sock = self._pick_socket()
+            for id in pending:
+                self._sendto(sock, raws[id], targets[id])
+
+            deadline = time.monotonic_ns() + int(self.timeout * 1e9)
+            self._collect_replies(sock, deadline, pending, replies)
+
+            if not pending:
+                return [replies[pkt.id] for pkt in pkts]
 
         raise Timeout
 
@@ -185,12 +502,10 @@ class Client(host.Host):
             if pkt.auth_type == 'eap-md5':
                 # Creating EAP-Identity
                 password = pkt[2][0] if 2 in pkt else pkt[1][0]
-                pkt[79] = [struct.pack('!BBHB%ds' % len(password),
-                                       EAP_CODE_RESPONSE,
-                                       packet.current_id,
-                                       len(password) + 5,
-                                       EAP_TYPE_IDENTITY,
-                                       password)]
+                pkt[79] = [_EAP_HDR.pack(EAP_CODE_RESPONSE,
+                                         packet.current_id,
+                                         len(password) + 5,
+                                         EAP_TYPE_IDENTITY) + password]
             reply = self._send_packet(pkt, self.authport)
             if (
                     reply
@@ -198,24 +513,27 @@ class Client(host.Host):
                     and pkt.auth_type == 'eap-md5'
             ):
                 # Got an Access-Challenge
-                eap_code, eap_id, eap_size, eap_type, eap_md5 = struct.unpack(
-                    '!BBHB%ds' % (len(reply[79][0]) - 5), reply[79][0]
-                )
+                eap_code, eap_id, eap_size, eap_type = \
+                    _EAP_HDR.unpack_from(reply[79][0])
+                eap_md5 = reply[79][0][_EAP_HDR.size:]
                 # Sending back an EAP-Type-MD5-Challenge
                 # Thank god for http://www.secdev.org/python/eapy.py
                 client_pw = pkt[2][0] if 2 in pkt else pkt[1][0]
-                md5_challenge = hashlib.md5(
-                    struct.pack('!B', eap_id) + client_pw + eap_md5[1:]
-                ).digest()
-                pkt[79] = [
-                    struct.pack('!BBHBB', 2, eap_id, len(md5_challenge) + 6,
-                                4, len(md5_challenge)) + md5_challenge
-                ]
+                # Assemble id + password + challenge in one buffer so
+                # the hash input needs no intermediate concatenations.
+                buf = bytearray(len(client_pw) + len(eap_md5))
+                buf[0] = eap_id
+                buf[1:1 + len(client_pw)] = client_pw
+                buf[1 + len(client_pw):] = eap_md5[1:]
+                md5_challenge = hashlib.md5(buf).digest()
+                response = bytearray(6 + len(md5_challenge))
+                _EAP_MD5_HDR.pack_into(
+                    response, 0, EAP_CODE_RESPONSE, eap_id,
+                    len(md5_challenge) + 6, 4, len(md5_challenge))
+                response[6:] = md5_challenge
+                pkt[79] = [bytes(response)]
                 # Copy over Challenge-State
                 pkt[24] = reply[24]
                 reply = self._send_packet(pkt, self.authport)
             return reply
-        elif isinstance(pkt, packet.CoAPacket):
-            return self._send_packet(pkt, self.coaport)
-        else:
-            return self._send_packet(pkt, self.acctport)
+        return self._send_packet(pkt, self._packet_port(pkt))
@@ -108,6 +108,11 @@ class Attribute:
         self.name = name
         self.code = code
         self.type = datatype
+        # The codec functions, bound at parse time so the packet build
+        # and decode loops call them with no dispatch; None for the
+        # unsupported types.
+        self.encoder = encoding.ENCODE_MAP.get(datatype)
+        self.decoder = encoding.DECODE_MAP.get(datatype)
         self.vendor = vendor
         self.encrypt = encrypt
         self.has_tag = has_tag
@@ -144,7 +149,14 @@ class Dictionary:
         self.vendors.add('', 0)
         self.attrindex = bidict.BiDict()
         self.attributes = {}
+        # Direct code (or vendor/code tuple) to Attribute mapping so
+        # packet decode does not have to translate codes to names first.
+        self.attributes_by_code = {}
         self.defer_parse = []
+        # Memoized name<->code resolutions, maintained for the packet
+        # key-translation helpers and flushed on every dictionary load.
+        self._encode_key_cache = {}
+        self._decode_key_cache = {}
 
         if dict:
             self.read_dictionary(dict)
@@ -249,6 +261,7 @@ class Dictionary:
         self.attrindex.add(attribute, key)
         self.attributes[attribute] = Attribute(attribute, code, datatype, is_sub_attribute,
                                                vendor, encrypt=encrypt, has_tag=has_tag)
+        self.attributes_by_code[key] = self.attributes[attribute]
         if datatype == 'tlv':
             # save attribute in tlvs
             state['tlvs'][code] = self.attributes[attribute]
@@ -356,6 +369,9 @@ class Dictionary:
 
         fil = dictfile.DictFile(file)
 
+        self._encode_key_cache.clear()
+        self._decode_key_cache.clear()
+
         state = {}
         state['vendor'] = ''
         state['tlvs'] = {}
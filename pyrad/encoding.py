@@ -2,14 +2,64 @@
 
 import binascii
 import ipaddress
+import socket
 import struct
 
+_unhexlify = binascii.unhexlify
+
+# Compiled once so the common encodes skip the per-call format parse.
+_S_UINT32 = struct.Struct('!I')
+_S_UINT64 = struct.Struct('!Q')
+_S_INT32 = struct.Struct('!i')
+_S_UINT16 = struct.Struct('!H')
+_S_UINT8 = struct.Struct('!B')
+
+# Fixed Ascend-Binary record layouts; one per address family since the
+# prefixes are 4 or 16 bytes wide.
+_ASCEND_V4 = struct.Struct('!BBBx4s4sBBBxHHBB2x8x')
+_ASCEND_V6 = struct.Struct('!BBBx16s16sBBBxHHBB2x8x')
+
+# Keyword dispatch for the Ascend filter tokens: exact (key, value)
+# matches flip a flag field, the remaining keys carry prefixes or
+# plain integers.
+_ASCEND_FLAGS = {
+    ('family', 'ipv6'): ('family', 3),
+    ('action', 'accept'): ('action', 1),
+    ('direction', 'out'): ('direction', 0),
+}
+_ASCEND_INT_FIELDS = frozenset(
+    ('proto', 'sport', 'dport', 'sportq', 'dportq'))
+
+
+def _parse_ascend_filter(string):
+    """Parse the type=value tokens of an Ascend filter string."""
+    fields = {'family': 1, 'action': 0, 'direction': 1,
+              'src': b'', 'dst': b'', 'srcl': 0, 'dstl': 0,
+              'proto': 0, 'sport': 0, 'dport': 0,
+              'sportq': 0, 'dportq': 0}
+    for t in string.split(' '):
+        (key, value) = t.split('=')
+        flag = _ASCEND_FLAGS.get((key, value))
+        if flag is not None:
+            fields[flag[0]] = flag[1]
+        elif key == 'src' or key == 'dst':
+            ip = ipaddress.ip_network(value)
+            fields[key] = ip.network_address.packed
+            fields[key + 'l'] = ip.prefixlen
+        elif key in _ASCEND_INT_FIELDS:
+            fields[key] = int(value)
+    return fields
+
 
 def encode_string(string):
+    # Type check first so ints fail fast, and measure the encoded form:
+    # the on-wire limit is 253 octets, not 253 characters.
+    if isinstance(string, str):
+        string = string.encode()
+    elif not isinstance(string, (bytes, bytearray)):
+        raise TypeError('Can only encode strings or bytes')
     if len(string) > 253:
         raise ValueError('Can only encode strings of <= 253 characters')
-    if isinstance(string, str):
-        return string.encode('utf-8')
     return string
 
 
@@ -17,30 +67,44 @@ def encode_octets(string):
     if len(string) > 253:
         raise ValueError('Can only encode strings of <= 253 characters')
 
-    if string.startswith(b'0x'):
-        hexstring = string.split(b'0x')[1]
-        return binascii.unhexlify(hexstring)
-    else:
-        return string
+    if string[:2] == b'0x':
+        return _unhexlify(string[2:])
+    return string
 
 
 def encode_ipv4_address(addr):
     if not isinstance(addr, str):
         raise TypeError('Address has to be a string')
-    return ipaddress.IPv4Address(addr).packed
+    # inet_aton packs in one C call, without building an IPv4Address
+    # object per attribute.
+    try:
+        return socket.inet_aton(addr)
+    except OSError:
+        raise ipaddress.AddressValueError(addr)
 
 
 def encode_ipv6_prefix(addr):
     if not isinstance(addr, str):
         raise TypeError('IPv6 Prefix has to be a string')
-    ip = ipaddress.IPv6Network(addr)
-    return struct.pack('BB', 0, ip.prefixlen) + ip.network_address.packed
+    (address, _, prefixlen) = addr.partition('/')
+    prefixlen = int(prefixlen) if prefixlen else 128
+    if not 0 <= prefixlen <= 128:
+        raise ValueError(f'Invalid IPv6 prefix length {prefixlen}')
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, address)
+    except OSError:
+        raise ipaddress.AddressValueError(addr)
+    return bytes((0, prefixlen)) + packed
 
 
 def encode_ipv6_address(addr):
     if not isinstance(addr, str):
         raise TypeError('IPv6 Address has to be a string')
-    return ipaddress.IPv6Address(addr).packed
+    # libc parses the address directly; no IPv6Address instance.
+    try:
+        return socket.inet_pton(socket.AF_INET6, addr)
+    except OSError:
+        raise ipaddress.AddressValueError(addr)
 
 
 def encode_ascend_binary(string):
@@ -69,77 +133,108 @@ def encode_ascend_binary(string):
         4   not equal to
     """
 
-    terms = {
-        'family': b'\x01',
-        'action': b'\x00',
-        'direction': b'\x01',
-        'src': b'\x00\x00\x00\x00',
-        'dst': b'\x00\x00\x00\x00',
-        'srcl': b'\x00',
-        'dstl': b'\x00',
-        'proto': b'\x00',
-        'sport': b'\x00\x00',
-        'dport': b'\x00\x00',
-        'sportq': b'\x00',
-        'dportq': b'\x00'
-    }
+    f = _parse_ascend_filter(string)
+    layout = _ASCEND_V6 if f['family'] == 3 else _ASCEND_V4
 
-    for t in string.split(' '):
-        key, value = t.split('=')
-        if key == 'family' and value == 'ipv6':
-            terms[key] = b'\x03'
-            if terms['src'] == b'\x00\x00\x00\x00':
-                terms['src'] = 16 * b'\x00'
-            if terms['dst'] == b'\x00\x00\x00\x00':
-                terms['dst'] = 16 * b'\x00'
-        elif key == 'action' and value == 'accept':
-            terms[key] = b'\x01'
-        elif key == 'direction' and value == 'out':
-            terms[key] = b'\x00'
-        elif key in ('src', 'dst'):
-            ip = ipaddress.ip_network(value)
-            terms[key] = ip.network_address.packed
-            terms[key + 'l'] = struct.pack('B', ip.prefixlen)
-        elif key in ('sport', 'dport'):
-            terms[key] = struct.pack('!H', int(value))
-        elif key in ('sportq', 'dportq', 'proto'):
-            terms[key] = struct.pack('B', int(value))
-
-    trailer = 8 * b'\x00'
-
-    result = b''.join((
-        terms['family'], terms['action'], terms['direction'], b'\x00',
-        terms['src'], terms['dst'], terms['srcl'], terms['dstl'], terms['proto'], b'\x00',
-        terms['sport'], terms['dport'], terms['sportq'], terms['dportq'], b'\x00\x00', trailer))
-    return result
+    # One pack call emits the whole record; the 's' fields zero-pad the
+    # unset addresses, and the pad bytes cover the reserved octets and
+    # trailer.
+    return layout.pack(f['family'], f['action'], f['direction'],
+                       f['src'], f['dst'], f['srcl'], f['dstl'],
+                       f['proto'], f['sport'], f['dport'],
+                       f['sportq'], f['dportq'])
 
 
 def encode_integer(num, format='!I'):
-    try:
-        num = int(num)
-    except ValueError:
-        raise TypeError('Can not encode non-integer as integer')
+    # Exact-type check skips the try block and the int() call for the
+    # common already-int case; subclasses and strings take the slow
+    # coercion path.
+    if type(num) is not int:
+        try:
+            num = int(num)
+        except ValueError:
+            raise TypeError('Can not encode non-integer as integer')
+    if format == '!I':
+        return _S_UINT32.pack(num)
     return struct.pack(format, num)
 
 
 def encode_integer_64(num, format='!Q'):
-    try:
-        num = int(num)
-    except ValueError:
-        raise TypeError('Can not encode non-integer as integer64')
+    if type(num) is not int:
+        try:
+            num = int(num)
+        except ValueError:
+            raise TypeError('Can not encode non-integer as integer64')
+    if format == '!Q':
+        return _S_UINT64.pack(num)
     return struct.pack(format, num)
 
 
 def encode_date(num):
     if not isinstance(num, int):
         raise TypeError('Can not encode non-integer as date')
-    return struct.pack('!I', num)
+    return _S_UINT32.pack(num)
+
+
+def encode_signed(num):
+    if type(num) is not int:
+        try:
+            num = int(num)
+        except ValueError:
+            raise TypeError('Can not encode non-integer as signed')
+    return _S_INT32.pack(num)
+
+
+def encode_short(num):
+    if type(num) is not int:
+        try:
+            num = int(num)
+        except ValueError:
+            raise TypeError('Can not encode non-integer as short')
+    return _S_UINT16.pack(num)
+
+
+def encode_byte(num):
+    if type(num) is not int:
+        try:
+            num = int(num)
+        except ValueError:
+            raise TypeError('Can not encode non-integer as byte')
+    return _S_UINT8.pack(num)
+
+
+# Batched forms of the integer codecs. Encoding a run of N values is a
+# single struct call instead of N, which keeps the per-value work in C
+# when a packet carries many numeric attributes.
+
+def encode_integers(values):
+    try:
+        values = [int(v) for v in values]
+    except ValueError:
+        raise TypeError('Can not encode non-integer as integer')
+    return struct.pack(f'!{len(values)}I', *values)
+
+
+def decode_integers(data):
+    return list(struct.unpack(f'!{len(data) >> 2}I', data))
+
+
+def decode_integers_at(data, offsets):
+    # Bulk-decode 32 bit values scattered through a buffer (e.g. the
+    # value fields of a parsed packet) without slicing a bytes object
+    # per value.
+    unpack_from = _S_UINT32.unpack_from
+    return [unpack_from(data, offset)[0] for offset in offsets]
 
 
 def decode_string(string):
+    # isascii is a C-level scan; the common ASCII case then skips the
+    # UTF-8 state machine entirely.
+    if string.isascii():
+        return string.decode('ascii')
     try:
         return string.decode('utf-8')
-    except:
+    except UnicodeDecodeError:
         return string
 
 
@@ -148,37 +243,63 @@ def decode_octets(string):
 
 
 def decode_ipv4_address(addr):
-    return '.'.join((str(a) for a in struct.unpack('BBBB', addr)))
+    # inet_ntoa formats the dotted quad in one C call instead of four
+    # str conversions and a join.
+    return socket.inet_ntoa(addr)
 
 
 def decode_ipv6_prefix(addr):
-    addr = addr + b'\x00' * (18 - len(addr))
-    prefix = addr[:2]
-    addr = addr[2:]
-    _, prefix = struct.unpack('BB', prefix)
-    network = ipaddress.IPv6Network((addr, prefix))
-    return str(network)
+    # Format the address through libc and append the prefix length
+    # directly; no IPv6Network construction or host-bits validation.
+    if len(addr) < 18:
+        addr = addr.ljust(18, b'\x00')
+    return f'{socket.inet_ntop(socket.AF_INET6, addr[2:18])}/{addr[1]}'
 
 
 def decode_ipv6_address(addr):
-    addr = addr + b'\x00' * (16 - len(addr))
-    return str(ipaddress.IPv6Address(addr))
+    if len(addr) < 16:
+        addr = addr.ljust(16, b'\x00')
+    return socket.inet_ntop(socket.AF_INET6, addr)
 
 
 def decode_ascend_binary(string):
     return string
 
 
+def decode_uint32(num):
+    return _S_UINT32.unpack(num)[0]
+
+
+def decode_uint64(num):
+    return _S_UINT64.unpack(num)[0]
+
+
 def decode_integer(num, format='!I'):
+    if format == '!I':
+        return _S_UINT32.unpack(num)[0]
     return (struct.unpack(format, num))[0]
 
 
 def decode_integer_64(num, format='!Q'):
+    if format == '!Q':
+        return _S_UINT64.unpack(num)[0]
     return (struct.unpack(format, num))[0]
 
 
 def decode_date(num):
-    return (struct.unpack('!I', num))[0]
+    return _S_UINT32.unpack(num)[0]
+
+
+def decode_signed(num):
+    return _S_INT32.unpack(num)[0]
+
+
+def decode_short(num):
+    return _S_UINT16.unpack(num)[0]
+
+
+def decode_byte(num):
+    return _S_UINT8.unpack(num)[0]
 
 
 ENCODE_MAP = {
@@ -189,39 +310,71 @@ ENCODE_MAP = {
     'ipv6prefix': encode_ipv6_prefix,
     'ipv6addr': encode_ipv6_address,
     'abinary': encode_ascend_binary,
-    'signed': lambda value: encode_integer(value, '!i'),
-    'short': lambda value: encode_integer(value, '!H'),
-    'byte': lambda value: encode_integer(value, '!B'),
+    'signed': encode_signed,
+    'short': encode_short,
+    'byte': encode_byte,
     'date': encode_date,
     'integer64': encode_integer_64,
 }
 
 
+# Bound once so dispatch skips a global and the exception setup.
+_ENC_GET = ENCODE_MAP.get
+
+
 def encode_attr(datatype, value):
-    try:
-        return ENCODE_MAP[datatype](value)
-    except KeyError:
+    encoder = _ENC_GET(datatype)
+    if encoder is None:
         raise ValueError(f'Unknown attribute type {datatype}')
+    return encoder(value)
+
+
+def batch_encode(attrs):
+    # Encode a sequence of (datatype, value) pairs. Consecutive 32 bit
+    # values are packed as one run via encode_integers; everything else
+    # goes through the scalar codecs.
+    result = []
+    run = []
+
+    def flush():
+        packed = encode_integers(run)
+        result.extend(packed[i:i + 4] for i in range(0, len(packed), 4))
+        del run[:]
+
+    for (datatype, value) in attrs:
+        if datatype == 'integer' or datatype == 'date':
+            run.append(value)
+        else:
+            if run:
+                flush()
+            result.append(encode_attr(datatype, value))
+    if run:
+        flush()
+    return result
 
 
 DECODE_MAP = {
     'string': decode_string,
     'octets': decode_octets,
-    'integer': decode_integer,
+    'integer': decode_uint32,
     'ipaddr': decode_ipv4_address,
     'ipv6prefix': decode_ipv6_prefix,
     'ipv6addr': decode_ipv6_address,
     'abinary': decode_ascend_binary,
-    'signed': lambda value: decode_integer(value, '!i'),
-    'short': lambda value: decode_integer(value, '!H'),
-    'byte': lambda value: decode_integer(value, '!B'),
+    'signed': decode_signed,
+    'short': decode_short,
+    'byte': decode_byte,
     'date': decode_date,
-    'integer64': decode_integer_64,
+    'integer64': decode_uint64,
 }
 
 
+# Bound once so dispatch skips a global and the exception setup.
+_DEC_GET = DECODE_MAP.get
+
+
 def decode_attr(datatype, value):
-    try:
-        return DECODE_MAP[datatype](value)
-    except KeyError:
+    decoder = _DEC_GET(datatype)
+    if decoder is None:
         raise ValueError(f'Unknown attribute type {datatype}')
+    return decoder(value)
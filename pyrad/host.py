@@ -95,4 +95,12 @@ class Host:
         :param pkt: packet to send
         :type  pkt: Packet class instance
         """
+        # A scatter-gather send skips joining the reply segments when
+        # both the packet and the socket support it; test doubles and
+        # packet stand-ins fall back to the plain sendto path.
+        parts = getattr(pkt, 'create_raw_reply_parts', None)
+        sendmsg = getattr(fd, 'sendmsg', None)
+        if parts is not None and sendmsg is not None:
+            sendmsg(parts(), [], 0, pkt.source)
+            return
         fd.sendto(pkt.create_raw_reply(), pkt.source)
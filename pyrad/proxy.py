@@ -1,12 +1,22 @@
 # A RADIUS proxy as defined in RFC 2138
 
+import logging
 import select
 import socket
 
+from pyrad import packet
 from pyrad.packet import PacketCode
 from pyrad.server import Server
 from pyrad.server import ServerPacketError
 
+logger = logging.getLogger('pyrad')
+
+# Codes acceptable on the proxy reply socket, as a bitmask: the test is
+# one shift and AND instead of building a list per packet.
+_PROXY_REPLY_MASK = ((1 << PacketCode.ACCESS_ACCEPT)
+                     | (1 << PacketCode.ACCESS_REJECT)
+                     | (1 << PacketCode.ACCOUNTING_RESPONSE))
+
 
 class Proxy(Server):
     """Base class for RADIUS proxies.
@@ -34,12 +44,12 @@ class Proxy(Server):
         :param pkt: packet to process
         :type  pkt: Packet class instance
         """
-        if pkt.source[0] not in self.hosts:
+        host = self.hosts.get(pkt.source[0])
+        if host is None:
             raise ServerPacketError('Received packet from unknown host')
-        pkt.secret = self.hosts[pkt.source[0]].secret
+        pkt.secret = host.secret
 
-        if pkt.code not in [PacketCode.ACCESS_ACCEPT, PacketCode.ACCESS_REJECT,
-                            PacketCode.ACCOUNTING_RESPONSE]:
+        if not (1 << pkt.code) & _PROXY_REPLY_MASK:
             raise ServerPacketError('Received non-response on proxy socket')
 
     def _process_input(self, fd):
@@ -61,5 +71,41 @@ class Proxy(Server):
             pkt = self._grab_packet(
                 lambda data, s=self: s.create_packet(packet=data), fd)
             self._handle_proxy_packet(pkt)
+            self._drain_proxy_packets(fd)
         else:
             Server._process_input(self, fd)
+
+    def _drain_proxy_packets(self, fd):
+        """Process replies already queued behind the one just read.
+        A burst of replies is handled with one nonblocking recv per
+        extra datagram instead of a poll round-trip for each. Dropped
+        packets are logged just like in the main loop.
+
+        :param  fd: socket to read packets from
+        :type   fd: socket class instance
+        """
+        # One receive buffer per proxy: draining a burst reuses the
+        # same bytearray instead of allocating bytes per datagram.
+        rxbuf = getattr(self, '_rxbuf', None)
+        if rxbuf is None:
+            rxbuf = self._rxbuf = bytearray(self.max_packet_size)
+
+        while True:
+            try:
+                (nbytes, source) = fd.recvfrom_into(rxbuf,
+                                                    self.max_packet_size,
+                                                    socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                return
+            except (AttributeError, TypeError):
+                # Socket stand-ins without buffer or flag support.
+                return
+            pkt = self.create_packet(packet=bytes(rxbuf[:nbytes]))
+            pkt.source = source
+            pkt.fd = fd
+            try:
+                self._handle_proxy_packet(pkt)
+            except ServerPacketError as err:
+                logger.info('Dropping packet: ' + str(err))
+            except packet.PacketError as err:
+                logger.info('Received a broken packet: ' + str(err))
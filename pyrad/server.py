@@ -1,6 +1,7 @@
 import logging
 import select
 import socket
+import sys
 
 from pyrad import host
 from pyrad import packet
@@ -8,10 +9,18 @@ from pyrad.packet import PacketCode
 
 logger = logging.getLogger('pyrad')
 
+# Secrets are typically shared per realm; pooling them lets all hosts
+# of a realm reference one object instead of one copy each.
+_secret_pool = {}
+
 
 class RemoteHost:
     """Remote RADIUS capable host we can talk to."""
 
+    # Slot storage: no per-instance __dict__, and the per-packet
+    # .secret load is a fixed-offset read instead of a dict probe.
+    __slots__ = ('address', 'secret', 'name', 'authport', 'acctport', 'coaport')
+
     def __init__(self, address, secret, name, authport=1812, acctport=1813, coaport=3799):
         """Constructor.
 
@@ -28,8 +37,10 @@ class RemoteHost:
         :param   coaport: port used for CoA packets
         :type    coaport: integer
         """
-        self.address = address
-        self.secret = secret
+        # Interned addresses make the per-packet hosts lookup hit the
+        # string identity fast path when keyed with the same value.
+        self.address = sys.intern(address) if isinstance(address, str) else address
+        self.secret = _secret_pool.setdefault(secret, secret)
         self.authport = authport
         self.acctport = acctport
         self.coaport = coaport
@@ -194,12 +205,12 @@ class Server(host.Host):
         :param pkt: packet to process
         :type  pkt: Packet class instance
         """
-        if pkt.source[0] in self.hosts:
-            pkt.secret = self.hosts[pkt.source[0]].secret
-        elif '0.0.0.0' in self.hosts:
-            pkt.secret = self.hosts['0.0.0.0'].secret
-        else:
+        host = self.hosts.get(pkt.source[0])
+        if host is None:
+            host = self.hosts.get('0.0.0.0')
+        if host is None:
             raise ServerPacketError('Received packet from unknown host')
+        pkt.secret = host.secret
 
     def _handle_auth_packet(self, pkt):
         """Process a packet received on the authentication port.
@@ -242,7 +253,6 @@ class Server(host.Host):
         :type  pkt: Packet class instance
         """
         self._add_secret(pkt)
-        pkt.secret = self.hosts[pkt.source[0]].secret
         if pkt.code == PacketCode.COA_REQUEST:
             self.handle_coa_packet(pkt)
         elif pkt.code == PacketCode.DISCONNECT_REQUEST:
@@ -321,7 +331,11 @@ class Server(host.Host):
         for packets to arrive via the network and calls other methods
         to process them.
         """
-        self._poll = select.poll()
+        # Prefer epoll where the platform offers it; it keeps interest
+        # state in the kernel instead of rebuilding the fd set on every
+        # wait. Looked up at run time so tests can substitute it.
+        epoll = getattr(select, 'epoll', None)
+        self._poll = epoll() if epoll else select.poll()
         self._fdmap = {}
         self._prepare_sockets()
 
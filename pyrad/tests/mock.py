@@ -1,5 +1,6 @@
 import fcntl
 import os
+import time
 
 from pyrad.packet import PacketError
 
@@ -7,8 +8,9 @@ from pyrad.packet import PacketError
 class MockPacket:
     reply = object()
 
-    def __init__(self, code, verify=False, error=False):
+    def __init__(self, code, verify=False, error=False, id=0):
         self.code = code
+        self.id = id
         self.data = {}
         self.verify = verify
         self.error = error
@@ -37,19 +39,23 @@ class MockPacket:
 
 
 class MockSocket:
-    def __init__(self, domain, type, data=None):
+    def __init__(self, domain, type, data=None, error=False):
         self.domain = domain
         self.type = type
         self.closed = False
         self.options = []
         self.address = None
         self.output = []
+        self.blocking = True
+        self.error = error
+        self.sent = []
+        self.errqueue = []
 
+        self.data = data
         if data is not None:
             (self.read_end, self.write_end) = os.pipe()
             fcntl.fcntl(self.write_end, fcntl.F_SETFL, os.O_NONBLOCK)
             os.write(self.write_end, data)
-            self.data = data
         else:
             self.read_end = 1
             self.write_end = None
@@ -63,12 +69,38 @@ class MockSocket:
     def recv(self, buffer):
         return self.data[:buffer]
 
+    def recv_into(self, buffer, nbytes=0):
+        if self.data is None:
+            # Model an empty non-blocking socket; nap briefly so a
+            # caller polling a perpetually-ready fd (such as pytest's
+            # captured stdout) cannot spin hot until its deadline.
+            time.sleep(0.01)
+            raise BlockingIOError
+        data = self.data[:nbytes or len(buffer)]
+        buffer[:len(data)] = data
+        return len(data)
+
     def sendto(self, data, target):
         self.output.append((data, target))
 
+    def sendmsg(self, buffers, ancdata=None, flags=0, address=None):
+        if self.error:
+            raise OSError
+        self.sent.append((list(buffers), flags, address))
+
+    def recvmsg(self, bufsize, ancbufsize=0, flags=0):
+        # The error queue holds lists of (level, type, data) ancillary
+        # entries; an empty queue behaves like a non-blocking socket.
+        if not self.errqueue:
+            raise BlockingIOError
+        return (b'', self.errqueue.pop(0), 0, None)
+
     def setsockopt(self, level, opt, value):
         self.options.append((level, opt, value))
 
+    def setblocking(self, flag):
+        self.blocking = flag
+
     def close(self):
         self.closed = True
 
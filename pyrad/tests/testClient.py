@@ -1,5 +1,6 @@
 import select
 import socket
+import struct
 import unittest
 
 from pyrad.client import Client
@@ -7,6 +8,7 @@ from pyrad.client import Timeout
 from pyrad.packet import AcctPacket
 from pyrad.packet import AuthPacket
 from pyrad.packet import PacketCode
+from pyrad.tests.mock import MockFinished
 from pyrad.tests.mock import MockPacket
 from pyrad.tests.mock import MockPoll
 from pyrad.tests.mock import MockSocket
@@ -79,6 +81,22 @@ class SocketTests(unittest.TestCase):
         self.client.bind((BIND_IP, BIND_PORT))
         self.assertEqual(s.closed, True)
 
+    def testWorkerPool(self):
+        self.client.workers = 2
+        self.client._poll = MockPoll()
+        self.client._open_socket()
+        self.assertEqual(len(self.client._socks), 2)
+        self.failUnless(self.client._socket is self.client._socks[0])
+        for sock in self.client._socks:
+            self.failUnless(
+                (socket.SOL_SOCKET, socket.SO_REUSEPORT, 1) in sock.options)
+        socks = self.client._socks
+        self.client._close_socket()
+        for sock in socks:
+            self.assertEqual(sock.closed, True)
+        self.assertEqual(self.client._socks, [])
+        self.failUnless(self.client._socket is None)
+
     def testSendPacket(self):
         def MockSend(self, pkt, port):
             self._mock_pkt = pkt
@@ -163,6 +181,67 @@ class SocketTests(unittest.TestCase):
         packet = MockPacket(PacketCode.ACCOUNTING_REQUEST, verify=False)
         self.assertRaises(Timeout, self.client._send_packet, packet, 432)
 
+    def testZerocopySendHoldsPayload(self):
+        self.client._zerocopy = True
+        sock = MockSocket(1, 2)
+        self.client._sendto(sock, "data", "target")
+        (buffers, _flags, address) = sock.sent[0]
+        self.assertEqual(buffers, ["data"])
+        self.assertEqual(address, "target")
+        self.assertEqual(self.client._zc_pending[1], {0: "data"})
+
+    def testZerocopyReapReleasesPayload(self):
+        self.client._zerocopy = True
+        sock = MockSocket(1, 2)
+        self.client._sendto(sock, "data", "target")
+        done = struct.pack('=IBBBBII', 0, 5, 0, 0, 0, 0, 0)
+        sock.errqueue.append([(0, 0, done)])
+        self.client._reap_zerocopy(sock)
+        self.assertEqual(self.client._zc_pending[1], {})
+
+    def testZerocopyFallback(self):
+        self.client._zerocopy = True
+        sock = MockSocket(1, 2, error=True)
+        self.client._sendto(sock, "data", "target")
+        self.assertEqual(self.client._zerocopy, False)
+        self.assertEqual(sock.output, [("data", "target")])
+
+    def testSendPacketsValidReply(self):
+        self.client.retries = 1
+        self.client.timeout = 1
+        self.client._socket = MockSocket(1, 2, bytes([0, 7]))
+        self.client._poll = MockPoll()
+        MockPoll.results = [(1, select.POLLIN)]
+        packet = MockPacket(PacketCode.ACCOUNTING_REQUEST, verify=True, id=7)
+        replies = self.client.send_packets([packet])
+        self.assertEqual(replies, [packet.reply])
+
+    def testSendPacketsUnknownId(self):
+        # A reply whose identifier matches no pending request (or one
+        # already answered) is dropped and the client keeps waiting.
+        self.client.retries = 1
+        self.client.timeout = 1
+        self.client._socket = MockSocket(1, 2, bytes([0, 8]))
+        self.client._poll = MockPoll()
+        MockPoll.results = [(1, select.POLLIN)]
+        packet = MockPacket(PacketCode.ACCOUNTING_REQUEST, verify=True, id=7)
+        self.assertRaises(MockFinished, self.client.send_packets, [packet])
+
+    def testSendPacketsTimeout(self):
+        self.client.retries = 1
+        self.client.timeout = 0
+        packet = MockPacket(PacketCode.ACCESS_REQUEST, id=1)
+        self.assertRaises(Timeout, self.client.send_packets, [packet])
+        self.assertEqual(self.client._socket.output,
+                         [("request packet", (self.server, 1813))])
+
+    def testSendPacketsAccountDelay(self):
+        self.client.retries = 2
+        self.client.timeout = 1
+        packet = MockPacket(PacketCode.ACCOUNTING_REQUEST, id=1)
+        self.assertRaises(Timeout, self.client.send_packets, [packet])
+        self.assertEqual(packet["Acct-Delay-Time"], [1])
+
 
 class OtherTests(unittest.TestCase):
     def setUp(self):
@@ -3,119 +3,105 @@ from ipaddress import AddressValueError
 
 from pyrad import encoding
 
+# (function name, arguments, expected result)
+CODEC_CASES = [
+    ('encode_string', ('1234567890',), b'1234567890'),
+    ('encode_ipv4_address', ('192.168.0.255',), b'\xc0\xa8\x00\xff'),
+    ('encode_integer', (0x01020304,), b'\x01\x02\x03\x04'),
+    ('encode_integer', (0xFFFFFFFF,), b'\xff\xff\xff\xff'),
+    ('encode_integer_64', (0xFFFFFFFFFFFFFFFF,), b'\xff' * 8),
+    ('encode_integers', ([0x01020304, 0xFFFFFFFF],),
+     b'\x01\x02\x03\x04\xff\xff\xff\xff'),
+    ('encode_integers', ([],), b''),
+    ('encode_date', (0x01020304,), b'\x01\x02\x03\x04'),
+    ('encode_ascend_binary',
+     ('family=ipv4 action=discard direction=in dst=10.10.255.254/32',),
+     b'\x01\x00\x01\x00\x00\x00\x00\x00\n\n\xff\xfe\x00 '
+     b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+    ('encode_ipv6_prefix', ('fc66::/64',),
+     b'\x00\x40\xfc\x66\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+    ('decode_string', (b'1234567890',), '1234567890'),
+    ('decode_ipv4_address', (b'\xc0\xa8\x00\xff',), '192.168.0.255'),
+    ('decode_integer', (b'\x01\x02\x03\x04',), 0x01020304),
+    ('decode_integer_64', (b'\xff' * 8,), 0xFFFFFFFFFFFFFFFF),
+    ('decode_integers', (b'\x01\x02\x03\x04\xff\xff\xff\xff',),
+     [0x01020304, 0xFFFFFFFF]),
+    ('decode_integers', (b'',), []),
+    ('decode_integers_at', (b'\x00\x01\x02\x03\x04\xff\xff\xff\xff', (1, 5)),
+     [0x01020304, 0xFFFFFFFF]),
+    ('decode_date', (b'\x01\x02\x03\x04',), 0x01020304),
+    ('decode_ipv6_prefix',
+     (b'\x00\x40\xfc\x66\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',),
+     'fc66::/64'),
+    ('encode_attr', ('string', 'string'), b'string'),
+    ('encode_attr', ('octets', b'string'), b'string'),
+    ('encode_attr', ('ipaddr', '192.168.0.255'), b'\xc0\xa8\x00\xff'),
+    ('encode_attr', ('integer', 0x01020304), b'\x01\x02\x03\x04'),
+    ('encode_attr', ('date', 0x01020304), b'\x01\x02\x03\x04'),
+    ('encode_attr', ('integer64', 0xFFFFFFFFFFFFFFFF), b'\xff' * 8),
+    ('decode_attr', ('string', b'string'), 'string'),
+    ('decode_attr', ('ipaddr', b'\xc0\xa8\x00\xff'), '192.168.0.255'),
+    ('decode_attr', ('integer', b'\x01\x02\x03\x04'), 0x01020304),
+    ('decode_attr', ('integer64', b'\xff' * 8), 0xFFFFFFFFFFFFFFFF),
+    ('decode_attr', ('date', b'\x01\x02\x03\x04'), 0x01020304),
+]
+
+# (datatype, decoded value, wire form) — every supported scalar type
+# must survive encode_attr followed by decode_attr unchanged.
+ROUNDTRIP_CASES = [
+    ('string', '1234567890', b'1234567890'),
+    ('octets', b'string', b'string'),
+    ('ipaddr', '192.168.0.255', b'\xc0\xa8\x00\xff'),
+    ('ipv6addr', 'fc66::1', b'\xfc\x66' + b'\x00' * 13 + b'\x01'),
+    ('ipv6prefix', 'fc66::/64', b'\x00\x40\xfc\x66' + b'\x00' * 14),
+    ('integer', 0x01020304, b'\x01\x02\x03\x04'),
+    ('signed', -1, b'\xff\xff\xff\xff'),
+    ('short', 0x0102, b'\x01\x02'),
+    ('byte', 7, b'\x07'),
+    ('date', 0x01020304, b'\x01\x02\x03\x04'),
+    ('integer64', 0xFFFFFFFFFFFFFFFF, b'\xff' * 8),
+]
+
+# (function name, arguments, expected exception)
+ERROR_CASES = [
+    ('encode_string', ('x' * 254,), ValueError),
+    ('encode_string', (1,), TypeError),
+    ('encode_ipv4_address', ('TEST123',), AddressValueError),
+    ('encode_ipv4_address', (1,), TypeError),
+    ('encode_ipv6_prefix', ('fc66::/200',), ValueError),
+    ('encode_integer', ('ONE',), TypeError),
+    ('encode_integers', (['ONE'],), TypeError),
+    ('encode_date', ('1',), TypeError),
+    ('encode_attr', ('unknown', None), ValueError),
+    ('decode_attr', ('unknown', None), ValueError),
+]
 
-class EncodingTests(unittest.TestCase):
-    def testEncodeString(self):
-        self.assertEqual(
-            encoding.encode_string('1234567890'),
-            b'1234567890')
-        self.assertRaises(ValueError, encoding.encode_string, 'x' * 254)
-        self.assertRaises(TypeError, encoding.encode_string, 1)
-
-    def testEncodeAddress(self):
-        self.assertEqual(
-            encoding.encode_ipv4_address('192.168.0.255'),
-            b'\xc0\xa8\x00\xff')
-        self.assertRaises(AddressValueError, encoding.encode_ipv4_address, 'TEST123')
-        self.assertRaises(TypeError, encoding.encode_ipv4_address, 1)
-
-    def testEncodeInteger(self):
-        self.assertEqual(encoding.encode_integer(0x01020304), b'\x01\x02\x03\x04')
-
-    def testEncodeInteger64(self):
-        self.assertEqual(
-            encoding.encode_integer_64(0xFFFFFFFFFFFFFFFF), b'\xff' * 8
-        )
-
-    def testEncodeUnsignedInteger(self):
-        self.assertEqual(encoding.encode_integer(0xFFFFFFFF), b'\xff\xff\xff\xff')
-        self.assertRaises(TypeError, encoding.encode_integer, 'ONE')
-
-    def testEncodeDate(self):
-        self.assertEqual(encoding.encode_date(0x01020304), b'\x01\x02\x03\x04')
-        self.assertRaises(TypeError, encoding.encode_date, '1')
-
-    def testEncodeAscendBinary(self):
-        self.assertEqual(
-            encoding.encode_ascend_binary(
-                'family=ipv4 action=discard direction=in dst=10.10.255.254/32'),
-            b'\x01\x00\x01\x00\x00\x00\x00\x00\n\n\xff\xfe\x00 '
-            b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')
-
-    def testEncodeIPv6Prefix(self):
-        self.assertEqual(
-            encoding.encode_ipv6_prefix('fc66::/64'),
-            b'\x00\x40\xfc\x66\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')
-
-    def testDecodeString(self):
-        self.assertEqual(
-            encoding.decode_string(b'1234567890'),
-            '1234567890')
 
-    def testDecodeAddress(self):
-        self.assertEqual(
-            encoding.decode_ipv4_address(b'\xc0\xa8\x00\xff'),
-            '192.168.0.255')
-
-    def testDecodeInteger(self):
-        self.assertEqual(
-            encoding.decode_integer(b'\x01\x02\x03\x04'),
-            0x01020304)
-
-    def testDecodeInteger64(self):
-        self.assertEqual(
-            encoding.decode_integer_64(b'\xff' * 8), 0xFFFFFFFFFFFFFFFF
-        )
-
-    def testDecodeDate(self):
-        self.assertEqual(
-            encoding.decode_date(b'\x01\x02\x03\x04'),
-            0x01020304)
-
-    def testDecodeIPv6Prefix(self):
-        self.assertEqual(
-            encoding.decode_ipv6_prefix(
-                b'\x00\x40\xfc\x66\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
-            'fc66::/64')
-
-    def testEncodeAttr(self):
-        self.assertEqual(
-            encoding.encode_attr('string', 'string'),
-            b'string')
-        self.assertEqual(
-            encoding.encode_attr('octets', b'string'),
-            b'string')
-        self.assertEqual(
-            encoding.encode_attr('ipaddr', '192.168.0.255'),
-            b'\xc0\xa8\x00\xff')
-        self.assertEqual(
-            encoding.encode_attr('integer', 0x01020304),
-            b'\x01\x02\x03\x04')
-        self.assertEqual(
-            encoding.encode_attr('date', 0x01020304),
-            b'\x01\x02\x03\x04')
-        self.assertEqual(
-            encoding.encode_attr('integer64', 0xFFFFFFFFFFFFFFFF),
-            b'\xff' * 8)
-        self.assertRaises(ValueError, encoding.encode_attr, 'unknown', None)
-
-    def testDecodeAttr(self):
-        self.assertEqual(
-            encoding.decode_attr('string', b'string'),
-            'string')
-        self.assertEqual(
-            encoding.encode_attr('octets', b'string'),
-            b'string')
-        self.assertEqual(
-            encoding.decode_attr('ipaddr', b'\xc0\xa8\x00\xff'),
-            '192.168.0.255')
-        self.assertEqual(
-            encoding.decode_attr('integer', b'\x01\x02\x03\x04'),
-            0x01020304)
-        self.assertEqual(
-            encoding.decode_attr('integer64', b'\xff' * 8),
-            0xFFFFFFFFFFFFFFFF)
-        self.assertEqual(
-            encoding.decode_attr('date', b'\x01\x02\x03\x04'),
-            0x01020304)
-        self.assertRaises(ValueError, encoding.decode_attr, 'unknown', None)
+class EncodingTests(unittest.TestCase):
+    def testCodecs(self):
+        for (func, args, expected) in CODEC_CASES:
+            with self.subTest(func=func, args=args):
+                self.assertEqual(getattr(encoding, func)(*args), expected)
+
+    def testCodecErrors(self):
+        for (func, args, exception) in ERROR_CASES:
+            with self.subTest(func=func, args=args):
+                self.assertRaises(exception, getattr(encoding, func), *args)
+
+    def testRoundtrip(self):
+        for (dtype, value, packed) in ROUNDTRIP_CASES:
+            with self.subTest(dtype=dtype):
+                self.assertEqual(encoding.encode_attr(dtype, value), packed)
+                self.assertEqual(encoding.decode_attr(dtype, packed), value)
+
+    def testBatchEncode(self):
+        self.assertEqual(
+            encoding.batch_encode([
+                ('integer', 0x01020304),
+                ('date', 0x01020304),
+                ('string', 'string'),
+                ('integer', 0xFFFFFFFF)]),
+            [b'\x01\x02\x03\x04', b'\x01\x02\x03\x04',
+             b'string', b'\xff\xff\xff\xff'])
+        self.assertEqual(encoding.batch_encode([]), [])
+        self.assertRaises(ValueError, encoding.batch_encode, [('unknown', None)])
@@ -52,7 +52,7 @@ class PacketCreationTests(unittest.TestCase):
 
 class MockPacket:
     packet = object()
-    replypacket = object()
+    replypacket = b'reply packet'
     source = object()
 
     def Packet(self):
@@ -61,6 +61,9 @@ class MockPacket:
     def create_raw_reply(self):
         return self.replypacket
 
+    def create_raw_reply_parts(self):
+        return (b'reply', b' ', b'packet')
+
 
 class MockFd:
     data = None
@@ -71,6 +74,14 @@ class MockFd:
         self.target = target
 
 
+class MockSendmsgFd(MockFd):
+    buffers = None
+
+    def sendmsg(self, buffers, ancdata=None, flags=0, address=None):
+        self.buffers = list(buffers)
+        self.target = address
+
+
 class PacketSendTest(unittest.TestCase):
     def setUp(self):
         self.host = Host()
@@ -86,3 +97,10 @@ class PacketSendTest(unittest.TestCase):
         self.host.send_reply_packet(self.fd, self.packet)
         self.failUnless(self.fd.data is self.packet.replypacket)
         self.failUnless(self.fd.target is self.packet.source)
+
+    def testSendReplyPacketScatterGather(self):
+        fd = MockSendmsgFd()
+        self.host.send_reply_packet(fd, self.packet)
+        self.assertEqual(b''.join(fd.buffers),
+                         self.packet.create_raw_reply())
+        self.failUnless(fd.target is self.packet.source)
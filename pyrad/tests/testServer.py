@@ -285,10 +285,15 @@ class ServerRunTests(unittest.TestCase):
         self.server = Server()
         self.origpoll = select.poll
         select.poll = MockPoll
+        self.origepoll = getattr(select, 'epoll', None)
+        if self.origepoll is not None:
+            select.epoll = MockPoll
 
     def tearDown(self):
         MockPoll.results = []
         select.poll = self.origpoll
+        if self.origepoll is not None:
+            select.epoll = self.origepoll
         UnmockClassMethods(Server)
 
     def testRunInitializes(self):
@@ -16,12 +16,12 @@ setup(name='pyrad',
           'Development Status :: 6 - Mature',
           'Intended Audience :: Developers',
           'License :: OSI Approved :: BSD License',
-          'Programming Language :: Python :: 3.6',
           'Programming Language :: Python :: 3.8',
           'Topic :: Software Development :: Libraries :: Python Modules',
           'Topic :: System :: Systems Administration :: Authentication/Directory',
       ],
       packages=find_packages(exclude=['tests']),
+      python_requires='>=3.8',
       keywords=['radius', 'authentication'],
       zip_safe=True,
       include_package_data=True,